@@ -7,6 +7,7 @@ use v5.10;
 use Getopt::Long;
 use Pod::Usage;
 use FindBin;
+use File::Spec;
 
 =pod
 
@@ -60,6 +61,9 @@ extract_seq_from_fasta.pl - Extract select isoforms from the FlyBase FASTA files
 =item  --fasta <file>
 
 The FASTA file to read from.  File can be a plain text or gzip compressed FASTA file.
+Gzip compressed files larger than 32 MiB are decompressed in parallel with
+C<rapidgzip> if it is found in your PATH.  Otherwise C<igzip> from ISA-L is
+used if found, falling back to C<gzip>.
 
 =item  --longest
 
@@ -74,6 +78,8 @@ The FASTA file to read from.  File can be a plain text or gzip compressed FASTA
 =item  --byid <file>
 
   Extract sequences by their ID contained in <file>.  <file> must have one ID per line.
+  Reading of the FASTA file stops once all IDs have been found.  FASTA input on
+  STDIN is always read to the end.
 
 =item --help 
 
@@ -102,7 +108,8 @@ Uniqueness is determined by the MD5 checksum of the sequence itself.
 
 =head3 By ID
 
-Extracts FASTA entries by ID from the input file.
+Extracts FASTA entries by ID from the input file.  Entries are written in the
+order they appear in the input file.
 
 =head1 AUTHOR
 
@@ -173,7 +180,9 @@ if ( $fasta eq '-' ) {
 else {
   # IF FASTA file ends with .gz extension, pipe it through gunzip first.
   if ($fasta =~ /\.gz$/) {
-    open( $fasta_fh, '-|', "gzip -dc $fasta" );
+    my @gunzip = find_decompressor($fasta);
+    say STDERR "Decompressing $fasta with @gunzip..." if $debug;
+    open( $fasta_fh, '-|', @gunzip, $fasta );
   }
   else {
     open( $fasta_fh, '<', $fasta );
@@ -195,8 +204,9 @@ while (my $buf = <$fasta_fh>) {
   chomp $buf;
   next if ($buf =~ m/^\s*?$/);
 
+  my $record = create_record({ entry=>$buf });
+
   if ($longest) {
-    my $record = create_record({ entry=>$buf });
     my $fbgn = $record->{fbgn};
 
     if (!defined $seqs->{$fbgn}) {
@@ -210,7 +220,6 @@ while (my $buf = <$fasta_fh>) {
     }
   }
   elsif ($unique) {
-    my $record = create_record({ entry=>$buf });
     my $fbgn = $record->{fbgn};
     my $md5 = $record->{md5};
     my $key = $fbgn . '_' . $md5;
@@ -226,16 +235,30 @@ while (my $buf = <$fasta_fh>) {
     }
   }
   elsif ($byid) {
-    my $record = create_record({ entry=>$buf });
+    # Matching entries are written out as they are read, no need to hold them.
     my $id = $record->{id};
-    if (exists $ids->{$id}) {
-      $seqs->{$id} = $record;
+    if (defined $id && exists $ids->{$id}) {
+      print '>', $record->{entry};
+      # Write each ID once and stop parsing once every ID has been found.
+      delete $ids->{$id};
+      unless (%{$ids}) {
+        # Keep reading STDIN to the end so the command feeding the pipe isn't killed by SIGPIPE.
+        if ($fasta eq '-') {
+          local $/ = \65536;
+          1 while <$fasta_fh>;
+        }
+        last;
+      }
     }
   }
 }
 
+if ($byid && $debug) {
+  say STDERR "ID $_ not found..." for sort keys %{$ids};
+}
+
 for my $key (keys %{$seqs}) {
-  print $seqs->{$key}{fasta};
+  print '>', $seqs->{$key}{entry};
 }
 
 
@@ -244,46 +267,79 @@ sub read_ids {
   my $ids;
   open (my $fh, '<', $file);
   while (<$fh>) {
-    chomp;
+    s/^\s+|\s+$//g;
+    next unless length;
     $ids->{$_} = undef;
   }
   close($fh);
   return $ids;
 }
 
+sub find_decompressor {
+  my $file = shift;
+
+  # rapidgzip decompresses with all available cores, which only pays off
+  # for larger files.
+  my $rapidgzip = find_in_path('rapidgzip');
+  return ($rapidgzip, '-d', '-c', '-P', 0) if $rapidgzip && -s $file > 32 * 1024 * 1024;
+
+  # ISA-L's igzip is a drop in replacement for gzip -dc that is typically
+  # 2-3x faster, fallback to gzip when it isn't installed.
+  my $gunzip = find_in_path('igzip') || find_in_path('gzip') || 'gzip';
+  return ($gunzip, '-dc');
+}
+
+sub find_in_path {
+  my $cmd = shift;
+  for my $dir (File::Spec->path) {
+    my $path = File::Spec->catfile($dir, $cmd);
+    return $path if -f $path && -x _;
+  }
+  return;
+}
+
 sub create_record {
   my ($args) = @_;
   my $entry = $args->{entry};
 
-  my $id     = get_header_value('ID',$entry);
-  my $fbgn   = get_fbgn($entry);
-  my $len    = get_header_value('length',$entry);
-  my $md5    = get_header_value('MD5', $entry);
+  my $attrs  = parse_header($entry);
+  my $id     = $attrs->{ID};
+  my $fbgn   = get_fbgn($attrs);
+  my $len    = $attrs->{length};
+  my $md5    = $attrs->{MD5};
 
   return {
     id     => $id,
     fbgn   => $fbgn,
     length => $len,
     md5    => $md5,
-    fasta  => '>' . $entry,
+    entry  => $entry,
   };
 }
 
 sub get_fbgn {
-  my $header = shift;
-  my $id      = get_header_value('ID',$header);
-  my $parents = get_header_value('parent',$header);
+  my $attrs = shift;
+  my $id      = $attrs->{ID};
+  my $parents = $attrs->{parent};
   my @fbgn = grep { /^FBgn\d+$/ } split(/,/,$parents) if ($parents);
 
   return $id if $id && $id =~ /^FBgn\d+$/;
-  return $fbgn[0] if (scalar @fbgn > 0 && $fbgn[0] =~ /^FBgn\d+$/);
+  return $fbgn[0] if (scalar @fbgn > 0);
   return undef;
 }
 
-sub get_header_value {
-  my ($key,$header) = @_;
-  $header =~ m/$key=(.*?);/;
-  return $1;
+sub parse_header {
+  # Split the 'key=value;' attributes of the header line in a single pass
+  # instead of running a separate regex over the entry for every key.
+  my $entry = shift;
+  my ($header) = split(/\n/, $entry, 2);
+  # Split on any run of whitespace (space or tab) after the record name, ignoring leading whitespace.
+  my (undef, $attr_col) = split(' ', $header, 2);
+  my %attrs;
+
+  for my $attr (split(/;\s*/, $attr_col // '')) {
+    my ($key, $value) = split(/=/, $attr, 2);
+    $attrs{$key} = $value if defined $value && !exists $attrs{$key};
+  }
+  return \%attrs;
 }
-
-
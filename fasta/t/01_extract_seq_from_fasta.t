@@ -0,0 +1,133 @@
+#!/usr/bin/env perl
+
+use strict;
+use warnings;
+use FindBin;
+use File::Temp qw(tempdir);
+use IO::Compress::Gzip qw(gzip $GzipError);
+
+use Test::More tests => 17;
+
+my $script = "$FindBin::Bin/../extract_seq_from_fasta.pl";
+my $fasta  = "$FindBin::Bin/data/test.fasta";
+my $ids    = "$FindBin::Bin/data/ids.txt";
+my $all_ids = "$FindBin::Bin/data/all_ids.txt";
+
+ok(-e $script,'Script exists');
+
+# Exit status of the last run_extract call.
+my $exit_status;
+
+# Run the script and return its FASTA output as a list of 'ID:sequence' strings.
+sub run_extract {
+    my @args = @_;
+    open(my $fh, '-|', $^X, $script, @args) or die "Can't run extract script.";
+    local $/;
+    my $stdout = <$fh>;
+    close($fh);
+    $exit_status = $?;
+    return parse_records($stdout);
+}
+
+# Split FASTA output into a list of 'ID:sequence' strings.
+sub parse_records {
+    my $stdout = shift;
+    my @records;
+    for my $entry (grep { /\S/ } split(/^>/m, $stdout)) {
+        my ($header, @seq) = split(/\n/, $entry);
+        my ($id) = split(' ', $header);
+        push @records, $id . ':' . join('', @seq);
+    }
+    return @records;
+}
+
+is_deeply(
+    [sort(run_extract('--longest', '--fasta', $fasta))],
+    [qw(FBpp0002:MKLVVVVVVVAA FBpp0003:MKLVV FBpp0006:MKLAAAAA FBpp0007:MKLA FBpp0008:MKLAAA)],
+    'Longest isoform per gene, first one wins on ties'
+);
+
+is_deeply(
+    [sort(run_extract('--unique', '--fasta', $fasta))],
+    [qw(FBpp0001:MKLVVVVVVV FBpp0002:MKLVVVVVVVAA FBpp0003:MKLVV FBpp0005:MKL
+        FBpp0006:MKLAAAAA FBpp0007:MKLA FBpp0007:MKLG FBpp0008:MKLAAA FBpp0009:MK)],
+    'Unique sequences per gene'
+);
+
+my @byid = run_extract('--byid', $ids, '--fasta', $fasta);
+is_deeply(
+    \@byid,
+    [qw(FBpp0001:MKLVVVVVVV FBpp0006:MKLAAAAA FBpp0007:MKLA)],
+    'By ID in input order, trimmed IDs, first duplicate wins'
+);
+ok(!(grep { /^FBpp9999:/ } @byid), 'Missing ID is skipped');
+
+{
+    my ($fh, $header);
+    open($fh, '-|', $^X, $script, '--byid', $ids, '--fasta', $fasta) or die "Can't run extract script.";
+    $header = <$fh>;
+    close($fh);
+    like($header, qr/^>FBpp0001 .*species=Dmel;$/, 'By ID header is written unchanged');
+}
+
+{
+    # Header whose last attribute has no trailing ';'.
+    my @records = run_extract('--longest', '--fasta', $fasta);
+    ok((grep { $_ eq 'FBpp0006:MKLAAAAA' } @records), 'length parsed from last attribute without ;');
+    # Header with tabs instead of spaces between the record name and the attributes.
+    ok((grep { $_ eq 'FBpp0008:MKLAAA' } @records) && !(grep { /^FBpp0009:/ } @records),
+        'attributes parsed from a tab separated header');
+}
+
+{
+    my $dir = tempdir(CLEANUP => 1);
+    my $gz  = "$dir/test.fasta.gz";
+    gzip($fasta => $gz) or die "gzip failed: $GzipError";
+
+    is_deeply(
+        [run_extract('--byid', $ids, '--fasta', $gz)],
+        \@byid,
+        'By ID from a gzip compressed FASTA'
+    );
+    is_deeply(
+        [sort(run_extract('--longest', '--fasta', $gz))],
+        [sort(run_extract('--longest', '--fasta', $fasta))],
+        'Longest from a gzip compressed FASTA'
+    );
+}
+
+{
+    # Every ID is found near the start of a FASTA larger than a pipe buffer, so reading stops early.
+    my $dir = tempdir(CLEANUP => 1);
+    my $big = "$dir/big.fasta";
+    open(my $in, '<', $fasta) or die "Can't read $fasta";
+    my $content = do { local $/; <$in> };
+    close($in);
+    $content .= ">FBpp1$_ type=protein; ID=FBpp1$_; parent=FBgn1$_,FBtr1$_; MD5=$_; length=60;\n" . ('A' x 60) . "\n"
+        for (1 .. 20000);
+    open(my $out, '>', $big) or die "Can't write $big";
+    print $out $content;
+    close($out);
+    gzip($big => "$big.gz") or die "gzip failed: $GzipError";
+
+    my @expected = qw(FBpp0001:MKLVVVVVVV FBpp0003:MKLVV);
+
+    is_deeply([run_extract('--byid', $all_ids, '--fasta', $big)], \@expected, 'All IDs found in a plain FASTA');
+    is($exit_status, 0, 'Exit status 0 when stopping early on a plain FASTA');
+
+    is_deeply([run_extract('--byid', $all_ids, '--fasta', "$big.gz")], \@expected, 'All IDs found in a gzip FASTA');
+    is($exit_status, 0, 'Exit status 0 when stopping early on a gzip FASTA');
+
+    # Feed the FASTA on STDIN, the writer must not get SIGPIPE.
+    my $stdout_file = "$dir/stdin.out";
+    local $SIG{PIPE} = 'IGNORE';
+    open(my $pipe, '|-', qq{"$^X" "$script" --byid "$all_ids" > "$stdout_file"}) or die "Can't run extract script.";
+    my $written = print $pipe $content;
+    my $closed = close($pipe);
+    ok($written, 'Whole FASTA written to STDIN without a broken pipe');
+    ok($closed && $? == 0, 'Exit status 0 when all IDs are found on STDIN');
+
+    open(my $result, '<', $stdout_file) or die "Can't read $stdout_file";
+    is_deeply([parse_records(do { local $/; <$result> })], \@expected, 'All IDs found on STDIN');
+    close($result);
+}
@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
-import time
 from gql import gql, Client
 from gql.transport.requests import RequestsHTTPTransport
 
 
-def get_client(url, **kwargs):
+def get_client(url, fetch_schema=False, **kwargs):
     """
     Setup the gql transport settings for hitting the FlyBase GraphQL API
     endpoint and return the client.
 
+    The transport holds a single requests.Session, so all queries executed with
+    the returned client reuse the same keep-alive connection.
+
     :param url: - The URL for the GraphQL endpoint.
+    :param fetch_schema: - Fetch the schema with an introspection query so that
+                           queries are validated client side before being sent.
+                           The server validates all queries regardless.
     :param kwargs: - Any additional keyword params to pass to the
                      RequestsHTTPTransport class.
     :return: The gql.Client class object.
@@ -20,30 +25,30 @@ def get_client(url, **kwargs):
         headers={
             "Content-type": "application/json",
         },
-        verify=False,
         retries=3,
         **kwargs
     )
     # Init and return GraphQL client.
     return Client(
         transport=flybase_transport,
-        fetch_schema_from_transport=True,
+        fetch_schema_from_transport=fetch_schema,
     )
 
 
-def get_allele_query():
+def get_allele_query(fbgns):
     """
     Function for setting up and returning an allele by gene query.
 
-    This query fetches all construct alleles of a gene specified by the $fbgn parameter.
+    This query fetches all construct alleles of the genes specified by the $fbgn0..$fbgnN parameters.
+    Each gene is requested under its own alias (gene0..geneN) so that all genes are fetched
+    in a single request.
     Then for each allele it returns the FBal ID, allele symbol, associated constructs,
     regulatory regions, tag uses, and tagged with entities.
 
+    :param fbgns: - The list of FBgn IDs to query.
     :return: The parsed graphql query object.
     """
-    allele_query = '''
-    query($fbgn:String!) {
-        gene:allelesByGene(fbgn:$fbgn, isConstruct: true) {
+    allele_fields = '''
             id
             symbol
             alleles {
@@ -66,8 +71,16 @@ def get_allele_query():
                     symbol
                 }
             }
-        }
-    }
+        '''
+    params = ', '.join(f"$fbgn{i}:String!" for i in range(len(fbgns)))
+    genes = '\n        '.join(
+        f"gene{i}:allelesByGene(fbgn:$fbgn{i}, isConstruct: true) {{{allele_fields}}}"
+        for i in range(len(fbgns))
+    )
+    allele_query = f'''
+    query({params}) {{
+        {genes}
+    }}
         '''
     # Parse and return the GraphQL query object
     return gql(allele_query)
@@ -89,15 +102,15 @@ def main():
 
     # Get the GQL client and query.
     client = get_client('http://api.flybase.org/graphql')
-    query = get_allele_query()
+    query = get_allele_query(fbgns)
 
-    for fbgn in fbgns:
-        # Execute query with fbgn parameter.
-        params = {"fbgn": fbgn}
-        result = client.execute(query, params)
+    # Execute a single query for all genes with the fbgn0..fbgnN parameters.
+    params = {f"fbgn{i}": fbgn for i, fbgn in enumerate(fbgns)}
+    result = client.execute(query, params)
 
+    for i, fbgn in enumerate(fbgns):
         # Process all alleles returned for this gene.
-        gene = result['gene']
+        gene = result[f"gene{i}"]
         for allele in gene['alleles']:
             fbal = allele['id']
 
@@ -125,9 +138,6 @@ def main():
             if len(tagged_with) > 0:
                 print(f"{fbgn} {fbal} Tagged With: {tagged_with}")
 
-        # Be nice to the GraphQL server.
-        time.sleep(1)
-
 
 if __name__ == '__main__':
     main()
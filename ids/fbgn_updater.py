@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 import sys
 import os
+import gc
+import pickle
+from collections import defaultdict
 
 """
 This script updates a list of FlyBase FBgn IDs to their current IDs
@@ -20,25 +23,85 @@ Assumptions:
 Author: Josh Goodman <jogoodma@iu.edu>
 """
 
+# Use a 1 MiB read buffer for the large FlyBase bulk files.
+READ_BUFFER_SIZE = 1 << 20
 
+# Suffix of the pickled dictionary cache written next to the FlyBase file.
+CACHE_SUFFIX = '.pkl'
+# Version of the cached dictionaries, bump it whenever the parsing changes so old caches are rebuilt.
+# CACHE_VERSION and the cache helpers below are duplicated in symbols/symbol_to_id_lookup.py,
+# keep both copies in lockstep.
+CACHE_VERSION = 1
+# Set this environment variable to a non-empty value to neither read nor write the cache.
+NO_CACHE_ENV = 'FLYBASE_NO_CACHE'
 
-def insert_fbid(primary: str = None, secondary: str = None, fbid_dict: dict = {}):
+
+def cache_enabled():
+    """
+    Checks whether the pickle cache should be used.  The cache file is trusted and
+    unpickled, so it can be turned off by setting the FLYBASE_NO_CACHE environment variable.
+
+    :return: False if FLYBASE_NO_CACHE is set to a non-empty value, True otherwise.
+    """
+    return not os.environ.get(NO_CACHE_ENV)
+
+
+def get_cache_key(source_file: str):
+    """
+    Builds the cache key for a FlyBase file from the cache format version and
+    the size and modification time of the file.
+
+    :param source_file: str - The FlyBase file to build the key for.
+    :return: The (CACHE_VERSION, st_size, st_mtime_ns) tuple.
+    """
+    stat = os.stat(source_file)
+    return CACHE_VERSION, stat.st_size, stat.st_mtime_ns
+
+
+def read_cache(cache_file: str, cache_key: tuple):
     """
-    Modifies the dictionary in place by inserting the secondary FlyBase ID as the key
-    and the primary FlyBase ID as the value.  If the secondary ID is already present in the
-    dictionary the primary ID is added to the unique set of FlyBase IDs in the value.
+    Loads a previously pickled result if one exists and was written under the same cache key.
 
-    :param primary:str - A single FlyBase ID to insert into the dictionary.
-    :param secondary:list -  A list of secondary IDs.
-    :param fbid_dict:dict - The dictionary reference to modify.
+    :param cache_file: str - The pickle cache file to read.
+    :param cache_key: tuple - The key of the FlyBase file, see get_cache_key().
+    :return: The cached result or None if there is no valid cache.
+    """
+    # The cyclic garbage collector only slows down unpickling millions of sets.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(cache_file, "rb") as file:
+            cached_key, result = pickle.load(file)
+    except (OSError, EOFError, TypeError, ValueError, pickle.UnpicklingError):
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+    if cached_key != cache_key:
+        return None
+    return result
+
+
+def write_cache(cache_file: str, cache_key: tuple, result):
+    """
+    Pickles the result along with its cache key.
+    Failure to write the cache (e.g. read only directory) is not an error.
+
+    :param cache_file: str - The pickle cache file to write.
+    :param cache_key: tuple - The key of the FlyBase file, taken before it was parsed.
+    :param result: - The result to cache.
     :return: None
     """
-    if secondary and secondary not in fbid_dict:
-        # If we haven't seen this fbid before initialize the set.
-        fbid_dict[secondary] = {primary}
-    elif secondary:
-        # We have seen this fbid before so we add it to the set.
-        fbid_dict[secondary].add(primary)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, "wb") as file:
+            pickle.dump((cache_key, result), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
     return None
 
 
@@ -47,29 +110,49 @@ def generate_inverted_fbid_dict(fbid_file: str):
     Generates an inverted dictionary of all secondary IDs as keys 
     and a set of primary FBids as values.
 
+    The result is cached in a pickle file next to the FlyBase file and reused
+    until the FlyBase file changes, unless FLYBASE_NO_CACHE is set.
+
     :param fbid_file: str - The FlyBase FBgn <=> Annotation ID (fbgn_annotation_ID_*.tsv) file to parse.
     :return: The inverted FlyBase id dictionary and a set of primary FlyBase IDs
     """
+    use_cache = cache_enabled()
+    if use_cache:
+        cache_file = fbid_file + CACHE_SUFFIX
+        # Stat the file before parsing so a file replaced mid-parse isn't cached under the new key.
+        cache_key = get_cache_key(fbid_file)
+        cached = read_cache(cache_file, cache_key)
+        if cached is not None:
+            return cached
+
     # Init the dictionary and set of current FlyBase ids.
-    fbid_dict = {}
+    fbid_dict = defaultdict(set)
     current_fbids = set()
 
-    # Open file and loop over lines.
-    with open(fbid_file, "r") as file:
+    # Open file in binary mode and loop over lines, only decoding the ones we keep.
+    with open(fbid_file, "rb", buffering=READ_BUFFER_SIZE) as file:
         for line in file:
-            line = line.strip()
-
             # This script only cares about genes for now.
-            if not line.startswith('#') and 'FBgn' in line:
+            if not line.startswith(b'#') and b'FBgn' in line:
+                line = line.decode('utf-8').strip()
                 # Split out the ID column and all the others.
                 symbol, species, primary_fbid, secondary_fbid_col, *rest = line.split('\t')
                 current_fbids.add(primary_fbid)
-                secondary_fbid_list = secondary_fbid_col.split(',')
-                [insert_fbid(primary_fbid, fbid, fbid_dict) for fbid in secondary_fbid_list]
-
+                # Map each secondary ID to the set of primary IDs it now belongs to.
+                for fbid in secondary_fbid_col.split(','):
+                    if fbid:
+                        fbid_dict[fbid].add(primary_fbid)
+
+    # Missing IDs should raise a KeyError on lookup instead of inserting an empty set.
+    fbid_dict.default_factory = None
+    if use_cache:
+        write_cache(cache_file, cache_key, (fbid_dict, current_fbids))
     return fbid_dict, current_fbids
 
 def main(user_ids, fbid_dict, current_ids):
+    # Bind the stdout write method once instead of calling print for every line.
+    write = sys.stdout.write
+
     # Open the user ID file and loop over it.
     with open(user_ids, 'r') as file:
         for fbid in file:
@@ -77,16 +160,16 @@ def main(user_ids, fbid_dict, current_ids):
             try:
                 # If the ID is current, print a line with no additional IDs.
                 if fbid in current_ids: 
-                    print(f"{fbid}")
+                    write(f"{fbid}\n")
                 # If the ID is not current, print all possible current IDs.
                 else:
                     # Fetch the ID set for the ID in their list.
                     ids = '\t'.join(fbid_dict[fbid])
                     # Print out results.
-                    print(f"{fbid}\t{ids}")
+                    write(f"{fbid}\t{ids}\n")
             except KeyError:
                 # Handle cases when their ID doesn't exist.
-                print(f"{fbid}\tNone")
+                write(f"{fbid}\tNone\n")
     return None;
 
 
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fbgn_updater
+
+FBGN_ANNOTATION_TSV = (
+    "## FlyBase FBgn <=> Annotation ID\n"
+    "#gene_symbol\torganism_abbreviation\tprimary_FBgn#\tsecondary_FBgn#\tannotation_ID\tsecondary_annotation_ID\n"
+    "a\tDmel\tFBgn0000001\tFBgn0000100,FBgn0000101\tCG1\t\n"
+    "b\tDmel\tFBgn0000002\tFBgn0000100\tCG2\t\n"
+)
+
+
+class TestInvertedFbidDictCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tsv = os.path.join(self.tmp_dir.name, 'fbgn_annotation_ID.tsv')
+        with open(self.tsv, 'w') as file:
+            file.write(FBGN_ANNOTATION_TSV)
+        self.cache_file = self.tsv + fbgn_updater.CACHE_SUFFIX
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assert_parsed(self, result):
+        fbid_dict, current_fbids = result
+        self.assertEqual(current_fbids, {'FBgn0000001', 'FBgn0000002'})
+        self.assertEqual(fbid_dict['FBgn0000100'], {'FBgn0000001', 'FBgn0000002'})
+        self.assertEqual(fbid_dict['FBgn0000101'], {'FBgn0000001'})
+        self.assertNotIn('FBgn9999999', fbid_dict)
+
+    def test_writes_cache(self):
+        self.assert_parsed(fbgn_updater.generate_inverted_fbid_dict(self.tsv))
+        self.assertTrue(os.path.exists(self.cache_file))
+        self.assert_parsed(fbgn_updater.generate_inverted_fbid_dict(self.tsv))
+
+    def test_cache_hit(self):
+        fbgn_updater.write_cache(self.cache_file, fbgn_updater.get_cache_key(self.tsv), 'cached')
+        self.assertEqual(fbgn_updater.generate_inverted_fbid_dict(self.tsv), 'cached')
+
+    def test_stale_cache(self):
+        fbgn_updater.write_cache(self.cache_file, fbgn_updater.get_cache_key(self.tsv), 'cached')
+        stat = os.stat(self.tsv)
+        os.utime(self.tsv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assert_parsed(fbgn_updater.generate_inverted_fbid_dict(self.tsv))
+
+    def test_cache_version_mismatch(self):
+        version, size, mtime = fbgn_updater.get_cache_key(self.tsv)
+        fbgn_updater.write_cache(self.cache_file, (version - 1, size, mtime), 'cached')
+        self.assert_parsed(fbgn_updater.generate_inverted_fbid_dict(self.tsv))
+
+    def test_cache_disabled(self):
+        fbgn_updater.write_cache(self.cache_file, fbgn_updater.get_cache_key(self.tsv), 'cached')
+        with mock.patch.dict(os.environ, {fbgn_updater.NO_CACHE_ENV: '1'}):
+            # A planted cache is not read.
+            self.assert_parsed(fbgn_updater.generate_inverted_fbid_dict(self.tsv))
+        os.remove(self.cache_file)
+        with mock.patch.dict(os.environ, {fbgn_updater.NO_CACHE_ENV: '1'}):
+            # And no cache is written.
+            self.assert_parsed(fbgn_updater.generate_inverted_fbid_dict(self.tsv))
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_corrupt_cache(self):
+        with open(self.cache_file, 'wb') as file:
+            file.write(b'not a pickle')
+        self.assert_parsed(fbgn_updater.generate_inverted_fbid_dict(self.tsv))
+        # The corrupt cache is replaced with a valid one.
+        self.assertIsNotNone(fbgn_updater.read_cache(self.cache_file, fbgn_updater.get_cache_key(self.tsv)))
+
+    def test_unwritable_cache(self):
+        cache_file = os.path.join(self.tmp_dir.name, 'missing_dir', 'cache.pkl')
+        fbgn_updater.write_cache(cache_file, fbgn_updater.get_cache_key(self.tsv), 'cached')
+        self.assertFalse(os.path.exists(cache_file))
+        self.assertIsNone(fbgn_updater.read_cache(cache_file, fbgn_updater.get_cache_key(self.tsv)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import sys
 import os
+import gc
+import pickle
 import re
+from collections import defaultdict
 
 """
 This script accepts a list of gene or transcript symbol/synonyms and converts them into one or more 
@@ -22,35 +25,124 @@ Assumptions:
 Author: Josh Goodman <jogoodma@iu.edu>
 """
 
+# Use a 1 MiB read buffer for the large FlyBase bulk files.
+READ_BUFFER_SIZE = 1 << 20
+
+# Suffix of the pickled dictionary cache written next to the FlyBase file.
+CACHE_SUFFIX = '.pkl'
+# Version of the cached dictionaries, bump it whenever the parsing changes so old caches are rebuilt.
+# CACHE_VERSION and the cache helpers below are duplicated in ids/fbgn_updater.py,
+# keep both copies in lockstep.
+CACHE_VERSION = 1
+# Set this environment variable to a non-empty value to neither read nor write the cache.
+NO_CACHE_ENV = 'FLYBASE_NO_CACHE'
+
 
 def insert_symbol(symbol: str, fbid: str, dict: dict):
     """
     Modifies the dictionary in place by inserting the symbol as the key
-    and the fbid as the value.  If the symbol is already present in the
-    dictionary the fbid is added to the unique set of FlyBase IDs in the value
+    and the fbid as the value.  The fbid is added to the unique set of FlyBase IDs
+    in the value
 
     :param symbol:str - A single symbol to insert into the dictionary.
     :param fbid:str -  A single FlyBase ID.
-    :param dict:dict - The dictionary reference to modify.
+    :param dict:defaultdict - The defaultdict(set) reference to modify.
     :return: None
     """
-    if symbol and symbol not in dict:
-        # If we haven't seen this symbol before initialize the set.
-        dict[symbol] = {fbid}
-    elif symbol:
-        # We have seen this symbol before so we add it to the set.
+    if symbol:
         dict[symbol].add(fbid)
     return None
 
 
+def cache_enabled():
+    """
+    Checks whether the pickle cache should be used.  The cache file is trusted and
+    unpickled, so it can be turned off by setting the FLYBASE_NO_CACHE environment variable.
+
+    :return: False if FLYBASE_NO_CACHE is set to a non-empty value, True otherwise.
+    """
+    return not os.environ.get(NO_CACHE_ENV)
+
+
+def get_cache_key(source_file: str):
+    """
+    Builds the cache key for a FlyBase file from the cache format version and
+    the size and modification time of the file.
+
+    :param source_file: str - The FlyBase file to build the key for.
+    :return: The (CACHE_VERSION, st_size, st_mtime_ns) tuple.
+    """
+    stat = os.stat(source_file)
+    return CACHE_VERSION, stat.st_size, stat.st_mtime_ns
+
+
+def read_cache(cache_file: str, cache_key: tuple):
+    """
+    Loads a previously pickled result if one exists and was written under the same cache key.
+
+    :param cache_file: str - The pickle cache file to read.
+    :param cache_key: tuple - The key of the FlyBase file, see get_cache_key().
+    :return: The cached result or None if there is no valid cache.
+    """
+    # The cyclic garbage collector only slows down unpickling millions of sets.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(cache_file, "rb") as file:
+            cached_key, result = pickle.load(file)
+    except (OSError, EOFError, TypeError, ValueError, pickle.UnpicklingError):
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+    if cached_key != cache_key:
+        return None
+    return result
+
+
+def write_cache(cache_file: str, cache_key: tuple, result):
+    """
+    Pickles the result along with its cache key.
+    Failure to write the cache (e.g. read only directory) is not an error.
+
+    :param cache_file: str - The pickle cache file to write.
+    :param cache_key: tuple - The key of the FlyBase file, taken before it was parsed.
+    :param result: - The result to cache.
+    :return: None
+    """
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, "wb") as file:
+            pickle.dump((cache_key, result), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+    return None
+
+
 def generate_inverted_symbol_dict(sym_file: str):
     """
     Generates an inverted dictionary of all symbols, synonyms, names, etc.
     as keys and a set of FBids as values.
 
+    The result is cached in a pickle file next to the FlyBase file and reused
+    until the FlyBase file changes, unless FLYBASE_NO_CACHE is set.
+
     :param sym_file: str - The FlyBase synonyms file to parse.
     :return: The inverted symbol/synonym dictionary.
     """
+    use_cache = cache_enabled()
+    if use_cache:
+        cache_file = sym_file + CACHE_SUFFIX
+        # Stat the file before parsing so a file replaced mid-parse isn't cached under the new key.
+        cache_key = get_cache_key(sym_file)
+        cached = read_cache(cache_file, cache_key)
+        if cached is not None:
+            return cached
+
     """
      Regex to split name synonyms on commas without spaces.
      Commas without a trailing space indicate a new name.
@@ -63,15 +155,14 @@ def generate_inverted_symbol_dict(sym_file: str):
     comma_ns_re = re.compile(r',(?!\s)')
 
     # Init the dictionary.
-    symbol_dict = {}
+    symbol_dict = defaultdict(set)
 
-    # Open file and loop over lines.
-    with open(sym_file, "r") as file:
+    # Open file in binary mode and loop over lines, only decoding the ones we keep.
+    with open(sym_file, "rb", buffering=READ_BUFFER_SIZE) as file:
         for line in file:
-            line = line.strip()
-
             # This script only cares about genes or transcripts ignore the rest.
-            if line.startswith('FBgn') or line.startswith('FBtr'):
+            if line.startswith((b'FBgn', b'FBtr')):
+                line = line.decode('utf-8').strip()
                 # Split out the ID column and all the others.
                 fbid, *cols = line.split('\t')
                 try:
@@ -88,13 +179,20 @@ def generate_inverted_symbol_dict(sym_file: str):
                         insert_symbol(cols[2], fbid, symbol_dict)
                     # Fullname synonyms
                     if col_len >= 4 and cols[3]:
-                        [insert_symbol(syn, fbid, symbol_dict) for syn in comma_ns_re.split(cols[3])]
+                        for syn in comma_ns_re.split(cols[3]):
+                            insert_symbol(syn, fbid, symbol_dict)
                     # Symbol synonyms
                     if col_len >= 5 and cols[4]:
-                        [insert_symbol(syn, fbid, symbol_dict) for syn in comma_ns_re.split(cols[4])]
+                        for syn in comma_ns_re.split(cols[4]):
+                            insert_symbol(syn, fbid, symbol_dict)
                 except IndexError:
                     print(f'Formatting problem found in line:\n{line}', file=sys.stderr)
                     continue
+
+    # Missing symbols should raise a KeyError on lookup instead of inserting an empty set.
+    symbol_dict.default_factory = None
+    if use_cache:
+        write_cache(cache_file, cache_key, symbol_dict)
     return symbol_dict
 
 
@@ -105,6 +203,9 @@ if __name__ == '__main__':
         # Generate the inverted dictionary.
         inverted_symbol_dict = generate_inverted_symbol_dict(fb_synonym)
 
+        # Bind the stdout write method once instead of calling print for every line.
+        write = sys.stdout.write
+
         # Open their symbol file and loop over it.
         with open(symbols_to_check, 'r') as file:
             for symbol in file:
@@ -113,9 +214,9 @@ if __name__ == '__main__':
                     # Fetch the ID set for the symbol in their list.
                     ids = inverted_symbol_dict[symbol]
                     # Print out results.
-                    print(f"{symbol}\t{','.join(ids)}")
+                    write(f"{symbol}\t{','.join(ids)}\n")
                 except KeyError:
                     # Symbol doesn't exist in dictionary.
-                    print(f"{symbol}")
+                    write(f"{symbol}\n")
     except ValueError:
         print(f"Usage: {os.path.basename(__file__)} your_symbols.txt fb_synonym.tsv", file=sys.stderr)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import symbol_to_id_lookup
+
+SYNONYMS_TSV = (
+    "##primary_FBid\torganism_abbreviation\tcurrent_symbol\tcurrent_fullname\tfullname_synonym(s)\tsymbol_synonym(s)\n"
+    "FBgn0000001\tDmel\ta\talpha gene\talpha, beta,al g\taa,ab\n"
+    "FBgn0000002\tDmel\tb\tbeta\t\tab\n"
+    "FBgn0000009\tDsim\ts\tsim\tx\ty\n"
+    "FBal0000001\tDmel\ta[1]\t\tq\t\n"
+)
+
+
+class TestInvertedSymbolDictCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tsv = os.path.join(self.tmp_dir.name, 'synonyms.tsv')
+        with open(self.tsv, 'w') as file:
+            file.write(SYNONYMS_TSV)
+        self.cache_file = self.tsv + symbol_to_id_lookup.CACHE_SUFFIX
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assert_parsed(self, symbol_dict):
+        self.assertEqual(symbol_dict['ab'], {'FBgn0000001', 'FBgn0000002'})
+        self.assertEqual(symbol_dict['alpha, beta'], {'FBgn0000001'})
+        self.assertEqual(symbol_dict['al g'], {'FBgn0000001'})
+        self.assertNotIn('s', symbol_dict)
+        self.assertNotIn('a[1]', symbol_dict)
+
+    def test_writes_cache(self):
+        self.assert_parsed(symbol_to_id_lookup.generate_inverted_symbol_dict(self.tsv))
+        self.assertTrue(os.path.exists(self.cache_file))
+        self.assert_parsed(symbol_to_id_lookup.generate_inverted_symbol_dict(self.tsv))
+
+    def test_cache_hit(self):
+        cache_key = symbol_to_id_lookup.get_cache_key(self.tsv)
+        symbol_to_id_lookup.write_cache(self.cache_file, cache_key, 'cached')
+        self.assertEqual(symbol_to_id_lookup.generate_inverted_symbol_dict(self.tsv), 'cached')
+
+    def test_stale_cache(self):
+        cache_key = symbol_to_id_lookup.get_cache_key(self.tsv)
+        symbol_to_id_lookup.write_cache(self.cache_file, cache_key, 'cached')
+        with open(self.tsv, 'a') as file:
+            file.write("FBgn0000003\tDmel\tc\t\t\t\n")
+        self.assert_parsed(symbol_to_id_lookup.generate_inverted_symbol_dict(self.tsv))
+
+    def test_cache_disabled(self):
+        symbol_to_id_lookup.write_cache(self.cache_file, symbol_to_id_lookup.get_cache_key(self.tsv), 'cached')
+        with mock.patch.dict(os.environ, {symbol_to_id_lookup.NO_CACHE_ENV: '1'}):
+            # A planted cache is not read.
+            self.assert_parsed(symbol_to_id_lookup.generate_inverted_symbol_dict(self.tsv))
+        os.remove(self.cache_file)
+        with mock.patch.dict(os.environ, {symbol_to_id_lookup.NO_CACHE_ENV: '1'}):
+            # And no cache is written.
+            self.assert_parsed(symbol_to_id_lookup.generate_inverted_symbol_dict(self.tsv))
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_corrupt_cache(self):
+        with open(self.cache_file, 'wb') as file:
+            file.write(b'not a pickle')
+        self.assert_parsed(symbol_to_id_lookup.generate_inverted_symbol_dict(self.tsv))
+
+
+if __name__ == '__main__':
+    unittest.main()